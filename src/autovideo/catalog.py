@@ -0,0 +1,327 @@
+import os
+import json
+import time
+import queue
+import pickle
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+
+from omegaconf import OmegaConf
+
+from autovideo.data.process import compute_embed, compute_embed_hashes, compute_text
+from autovideo.dedup import cluster
+from autovideo.models.clip import ModelClip
+from autovideo.models.gpt import ModelGpt
+from autovideo.text_index import TextIndex
+from autovideo.transcribe import TranscriptionEngine
+
+
+def probe(path: Path | str) -> dict:
+    """
+    Probe duration and resolution of a video with ffprobe. Missing fields are None.
+    """
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "format=duration:stream=width,height",
+        "-of", "json",
+        str(path)
+    ]
+    try:
+        output = json.loads(subprocess.check_output(cmd).decode())
+    except (OSError, subprocess.CalledProcessError, json.JSONDecodeError):
+        return {'duration': None, 'width': None, 'height': None}
+    stream = (output.get('streams') or [{}])[0]
+    duration = output.get('format', {}).get('duration')
+    return {
+        'duration': float(duration) if duration else None,
+        'width': stream.get('width'),
+        'height': stream.get('height'),
+    }
+
+
+def save_atomic(path: Path | str, obj, mode='wb'):
+    """
+    Write `obj` (pickled, or as JSON for text mode) to a uniquely named temporary file next to `path`
+    and rename it over `path`, so concurrent readers never see a partial file and concurrent writers
+    never share a temporary file.
+    """
+    path = Path(path)
+    with tempfile.NamedTemporaryFile(mode, dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False) as f:
+        try:
+            if 'b' in mode:
+                pickle.dump(obj, f)
+            else:
+                json.dump(obj, f)
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    os.replace(f.name, path)
+
+
+class Catalog:
+    """
+    In-memory index of the media files in a set of directories, persisted to `path` as JSON.
+    Files are only re-probed when their size or modification time changes.
+    """
+    def __init__(self, directories: list[Path | str], path: Path | str, extensions=('.mp4', '.mov')):
+        """
+        """
+        self.directories = [str(d) for d in directories]
+        self.path = Path(path)
+        self.extensions = tuple(e.lower() for e in extensions)
+        self.lock = threading.Lock()
+        self.entries: dict[str, dict] = {}
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)
+        self.refresh()
+
+    def refresh(self) -> tuple[list[str], list[str]]:
+        """
+        Rescan the directories, probing new or changed files and dropping deleted ones.
+
+        Returns:
+            tuple[list[str], list[str]]: Paths of changed (new or modified) and removed files.
+        """
+        found = {}
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                if entry.is_file() and entry.name.lower().endswith(self.extensions):
+                    found[os.path.join(directory, entry.name)] = entry.stat()
+
+        with self.lock:
+            entries = dict(self.entries)
+        changed = [
+            k for k, stat in found.items()
+            if k not in entries or (entries[k]['size'], entries[k]['mtime']) != (stat.st_size, stat.st_mtime)
+        ]
+        removed = [k for k in entries if k not in found]
+        if not changed and not removed:
+            return changed, removed
+
+        for k in changed:
+            entries[k] = {
+                'name': os.path.basename(k),
+                'path': k,
+                'directory': os.path.dirname(k),
+                'size': found[k].st_size,
+                'mtime': found[k].st_mtime,
+                **probe(k),
+            }
+        for k in removed:
+            del entries[k]
+
+        with self.lock:
+            self.entries = entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        save_atomic(self.path, entries, mode='w')
+        return changed, removed
+
+    def list(self, directory: Path | str, offset=0, limit=50) -> dict:
+        """
+        Page through the files of one directory, sorted by name.
+        """
+        directory = str(directory)
+        with self.lock:
+            entries = sorted((v for v in self.entries.values() if v['directory'] == directory), key=lambda v: v['name'])
+        return {
+            'total': len(entries),
+            'offset': offset,
+            'limit': limit,
+            'videos': entries[offset:offset + limit],
+        }
+
+
+class Watcher(threading.Thread):
+    """
+    Background thread that refreshes a catalog whenever its directories change and passes
+    changed and removed paths to `callback`. Uses inotify when `inotify_simple` is installed
+    (the `watch` extra) and falls back to polling every `interval` seconds otherwise.
+    """
+    def __init__(self, catalog: Catalog, callback, interval=5.0):
+        """
+        """
+        super().__init__(daemon=True)
+        self.catalog = catalog
+        self.callback = callback
+        self.interval = interval
+
+    def run(self):
+        try:
+            from inotify_simple import INotify, flags
+        except ImportError:
+            INotify = None
+
+        if INotify is None:
+            wait = lambda: time.sleep(self.interval)
+        else:
+            inotify = INotify()
+            mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE
+            for directory in self.catalog.directories:
+                if os.path.isdir(directory):
+                    inotify.add_watch(directory, mask)
+            # Wake on the first event, then wait briefly so a burst of events triggers one refresh.
+            wait = lambda: inotify.read(timeout=int(self.interval * 1000), read_delay=500)
+
+        while True:
+            wait()
+            try:
+                changed, removed = self.catalog.refresh()
+                if changed or removed:
+                    self.callback(changed + removed)
+            except Exception as e:
+                print(f"Error refreshing catalog: {str(e)}")
+
+
+class Indexer(threading.Thread):
+    """
+    Background thread that embeds queued clips into the `embeds.pkl` / `clusters.pkl` index in
+    `path` and calls `on_update` after each batch so the live search engine can be swapped.
+    Queued paths that no longer exist are removed from the index; clips that fail to index are
+    skipped without affecting the rest of their batch. If `previews` is given, poster
+    and sprite images are rendered from the frames sampled for perceptual hashing.
+
+    Re-indexed and removed clips are also dropped from `text_index.pkl`; with `text`, new clips are
+    captioned and transcribed into it. Clips missing from the text index are still found by
+    `SearchEngine`, which always dense-scans them.
+    """
+    def __init__(self, path: Path | str, on_update, model: ModelClip = None, stride=10, previews=None, text=False):
+        """
+        """
+        super().__init__(daemon=True)
+        self.path = Path(path)
+        self.on_update = on_update
+        self.previews = previews
+        self.model = model or ModelClip(OmegaConf.create({'name': 'ViT-B/16', 'temperature': 0.1}))
+        self.stride = stride
+        self.queue = queue.Queue()
+
+        self.model_gpt = ModelGpt(model='gpt-4o') if text else None
+        self.model_transcribe = TranscriptionEngine() if text else None
+
+        # `stats` records the (size, mtime) each clip had when it was indexed.
+        self.embeds, self.hashes, self.stats = {}, {}, {}
+        if (self.path / "embeds.pkl").exists():
+            with open(self.path / "embeds.pkl", "rb") as f:
+                self.embeds = pickle.load(f)
+        if (self.path / "clusters.pkl").exists():
+            with open(self.path / "clusters.pkl", "rb") as f:
+                clusters = pickle.load(f)
+            self.hashes, self.stats = clusters['hashes'], clusters.get('stats', {})
+        self.text_index = None
+        if (self.path / "text_index.pkl").exists():
+            self.text_index = TextIndex.load(self.path / "text_index.pkl")
+        elif text:
+            self.text_index = TextIndex()
+
+    def put(self, filename: str) -> bool:
+        """
+        Queue `filename` if it belongs to the indexed directory. Returns whether it was queued.
+        """
+        if Path(filename).parent != self.path:
+            return False
+        self.queue.put(filename)
+        return True
+
+    def sync(self, entries: dict[str, dict]) -> list[str]:
+        """
+        Reconcile the index with catalog `entries`, e.g. after the server was down: queue clips that are
+        not indexed yet, were replaced since they were indexed (size or mtime differs) or were deleted.
+        Indexed clips without recorded stats (built by `process.py`) are assumed current.
+        Returns the queued filenames.
+        """
+        queued = []
+        for filename, entry in entries.items():
+            if Path(filename).parent != self.path:
+                continue
+            stat = (entry['size'], entry['mtime'])
+            if filename not in self.embeds and filename not in self.hashes:
+                queued.append(filename)
+            elif filename not in self.stats:
+                self.stats[filename] = stat
+            elif tuple(self.stats[filename]) != stat:
+                queued.append(filename)
+        queued += [k for k in {**self.embeds, **self.hashes} if k not in entries]
+        return [filename for filename in queued if self.put(filename)]
+
+    def run(self):
+        while True:
+            batch = {self.queue.get()}
+            while not self.queue.empty():
+                batch.add(self.queue.get())
+            try:
+                self.index(sorted(batch))
+                self.on_update()
+            except Exception as e:
+                print(f"Error indexing {sorted(batch)}: {str(e)}")
+
+    def drop(self, filename: str):
+        """
+        Remove `filename` from the in-memory index.
+        """
+        self.embeds.pop(filename, None)
+        self.hashes.pop(filename, None)
+        self.stats.pop(filename, None)
+        if self.text_index is not None:
+            self.text_index.remove(filename)
+
+    def index(self, filenames: list[str]) -> list[str]:
+        """
+        Re-index `filenames` and save the index. A clip that cannot be read (e.g. still being copied)
+        keeps its previous entry and recorded stats, so it is picked up again once it changes.
+
+        Returns:
+            list[str]: Filenames that failed.
+        """
+        queued = set(filenames)
+        signatures = {tuple(self.hashes[k]): k for k in self.embeds if k in self.hashes and k not in queued}
+
+        failed = []
+        for filename in filenames:
+            if not os.path.exists(filename):
+                self.drop(filename)
+                continue
+            print(f"Indexing {filename}")
+            try:
+                stat = os.stat(filename)
+                frames = self.previews.sample() if self.previews else None
+                embed, hashes = compute_embed_hashes(filename, self.model, signatures, stride=self.stride, callback=frames.add if frames else None)
+            except Exception as e:
+                print(f"Error indexing {filename}: {str(e)}")
+                failed.append(filename)
+                continue
+            self.drop(filename)
+            self.hashes[filename] = hashes
+            self.stats[filename] = (stat.st_size, stat.st_mtime)
+            if self.previews:
+                self.previews.from_frames(filename, frames.frames)
+            if self.model_gpt or self.model_transcribe:
+                try:
+                    self.text_index.add(filename, compute_text(filename, self.model_gpt, self.model_transcribe))
+                except Exception as e:
+                    print(f"Error computing text for {filename}: {str(e)}")
+            if embed is None:
+                continue
+            signatures[tuple(hashes)] = filename
+            self.embeds[filename] = embed
+
+        # An exact duplicate may have lost the clip it duplicated; give it its own embedding.
+        for filename, hashes in list(self.hashes.items()):
+            if filename not in self.embeds and tuple(hashes) not in signatures:
+                try:
+                    self.embeds[filename] = compute_embed(filename, self.model, stride=self.stride)
+                    signatures[tuple(hashes)] = filename
+                except Exception as e:
+                    print(f"Error indexing {filename}: {str(e)}")
+
+        save_atomic(self.path / "embeds.pkl", self.embeds)
+        save_atomic(self.path / "clusters.pkl", {'clusters': cluster(self.embeds, self.hashes), 'hashes': self.hashes, 'stats': self.stats})
+        if self.text_index is not None:
+            self.text_index.save(self.path / "text_index.pkl")
+        return failed
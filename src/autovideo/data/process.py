@@ -1,14 +1,24 @@
+import os
 import pickle
+import subprocess
 from pathlib import Path
 from glob import glob
 
 import torch
+from PIL import Image
 from torchvision.transforms.functional import to_tensor
 from omegaconf import OmegaConf
 
 from autovideo.data.loaders import *
+from autovideo.dedup import compute_phash, cluster
+from autovideo.hashing import hash_content
 from autovideo.models.clip import ModelClip
-from autovideo.models.gpt import ModelGpt, ModelGptInput
+from autovideo.models.gpt import ModelGpt, ModelGptInput, unpack_content
+from autovideo.text_index import TextIndex
+from autovideo.transcribe import TranscriptionEngine
+
+
+CAPTION_PROMPT = "Describe the content of this video in one or two sentences, listing the main subjects, setting and any visible text."
 
 
 def compute_embed(path: Path | str, model: ModelClip, stride=10) -> torch.Tensor:
@@ -22,21 +32,146 @@ def compute_embed(path: Path | str, model: ModelClip, stride=10) -> torch.Tensor
     return torch.stack(embed).mean(0)
 
 
-def process(path: Path | str, extension="mp4", stride=10) -> dict:
+def is_copy(path: Path | str, original: Path | str) -> bool:
+    """
+    Whether `path` has the same contents as `original` (see `hashing.hash_content`). Matching perceptual
+    hashes only show the footage is the same; the audio (e.g. a different voiceover) may still differ.
+    """
+    return os.path.exists(original) and hash_content(path) == hash_content(original)
+
+
+def compute_embed_hashes(path: Path | str, model: ModelClip, signatures: dict = None, stride=10, hash_stride=30, max_deferred=8, callback=None) -> tuple[torch.Tensor | None, list[int]]:
+    """
+    Embed a clip and compute its perceptual hashes in a single decode pass.
+
+    While the hashes seen so far are a prefix of a known signature in `signatures`, the clip may be an
+    exact duplicate, so embedding is deferred (up to `max_deferred` frames are buffered). If the clip
+    matches a signature exactly and is a byte-identical copy of that clip (see `is_copy`), no embedding
+    is computed and None is returned. Only a clip that diverges from a known one after the buffer has
+    filled, or matches one without being a copy, is decoded a second time.
+    Each hashed frame is also passed to `callback`, if given.
+
+    Returns:
+        tuple[torch.Tensor | None, list[int]]: Mean embedding (None for exact duplicates) and hashes.
+    """
+    candidates = list(signatures or {})
+    embed, hashes, deferred, overflow = [], [], [], False
+    for i, frame in enumerate(read(path)):
+        if i % hash_stride == 0:
+            hashes.append(compute_phash(frame))
+            if callback:
+                callback(frame)
+            if candidates:
+                n = len(hashes)
+                candidates = [c for c in candidates if len(c) >= n and c[n - 1] == hashes[-1]]
+                if not candidates and not overflow:
+                    embed.extend(model.encode_image(to_tensor(f).unsqueeze(0))[0] for f in deferred)
+                    deferred = []
+        if i % stride:
+            continue
+        if overflow:
+            # The clip will be re-decoded for embedding unless it is an exact duplicate.
+            continue
+        if not candidates:
+            embed.append(model.encode_image(to_tensor(frame).unsqueeze(0))[0])
+        else:
+            deferred.append(frame)
+            if len(deferred) > max_deferred:
+                deferred, overflow = [], True
+
+    if tuple(hashes) in candidates and is_copy(path, signatures[tuple(hashes)]):
+        return None, hashes
+    if overflow:
+        return compute_embed(path, model, stride=stride), hashes
+    embed.extend(model.encode_image(to_tensor(f).unsqueeze(0))[0] for f in deferred)
+    return torch.stack(embed).mean(0), hashes
+
+
+def process(path: Path | str, extension="mp4", stride=10, hashes: dict = None) -> dict:
     """
+    Embed every clip in `path`. `hashes` is output-only: it is cleared and filled with the perceptual
+    hashes of each clip. Byte-identical copies of an earlier clip of this run are exact duplicates
+    and are not embedded (see `dedup.cluster`).
     """
     model = ModelClip(OmegaConf.create({'name': 'ViT-B/16', 'temperature': 0.1}))
+    hashes = {} if hashes is None else hashes
+    hashes.clear()
 
     outputs = {}
+    signatures = {}
     filenames = glob(f"{path}/*.{extension}")
     for filename in filenames:
         print(filename)
-        outputs[filename] = compute_embed(filename, model, stride=stride)
+        embed, hashes[filename] = compute_embed_hashes(filename, model, signatures, stride=stride)
+        signature = tuple(hashes[filename])
+        if embed is None:
+            print(f"Skipping exact duplicate of {signatures[signature]}")
+            continue
+        signatures[signature] = filename
+        outputs[filename] = embed
     return outputs
 
 
+def compute_caption(path: Path | str, model: ModelGpt, stride=30, max_frames=4) -> str:
+    """
+    Caption a clip from a few sampled frames.
+    """
+    model.reset()
+    input = ModelGptInput()
+    input.append(CAPTION_PROMPT)
+    count = 0
+    for i, frame in enumerate(read(path)):
+        if i % stride:
+            continue
+        input.append(Image.fromarray(frame[..., ::-1]))
+        count += 1
+        if count >= max_frames:
+            break
+    return unpack_content(model(input))
+
+
+def compute_text(path: Path | str, model_gpt: ModelGpt = None, model_transcribe: TranscriptionEngine = None) -> str:
+    """
+    Text indexed for a clip: its generated caption and its transcript, for whichever models are given.
+    """
+    text = []
+    if model_gpt:
+        text.append(compute_caption(path, model_gpt))
+    if model_transcribe:
+        try:
+            text.append(model_transcribe.transcribe(path)['text'])
+        except subprocess.CalledProcessError as e:
+            print(f"Skipping transcript for {path}: {e}")
+    return "\n".join(text)
+
+
+def process_text(path: Path | str, extension="mp4", captions=True, transcripts=True, index: TextIndex = None) -> TextIndex:
+    """
+    Build (or update) the BM25 index over per-clip transcripts and generated captions.
+    Clips already present in `index` are skipped.
+    """
+    index = TextIndex() if index is None else index
+    model_gpt = ModelGpt(model='gpt-4o') if captions else None
+    model_transcribe = TranscriptionEngine() if transcripts else None
+
+    filenames = glob(f"{path}/*.{extension}")
+    for filename in filenames:
+        if filename in index:
+            continue
+        print(filename)
+        index.add(filename, compute_text(filename, model_gpt, model_transcribe))
+    return index
+
+
 if __name__ == '__main__':
     path = Path("assets/data")
-    outputs = process(path)
+    hashes = {}
+    outputs = process(path, hashes=hashes)
     with open(path / "embeds.pkl", "wb") as f:
-        pickle.dump(outputs, f)
\ No newline at end of file
+        pickle.dump(outputs, f)
+    with open(path / "clusters.pkl", "wb") as f:
+        pickle.dump({'clusters': cluster(outputs, hashes), 'hashes': hashes}, f)
+
+    index_path = path / "text_index.pkl"
+    index = TextIndex.load(index_path) if index_path.exists() else None
+    process_text(path, index=index).save(index_path)
\ No newline at end of file
@@ -0,0 +1,99 @@
+import cv2
+import numpy as np
+import torch
+
+
+def compute_phash(frame: np.ndarray, hash_size=8) -> int:
+    """
+    Perceptual hash of a BGR frame: sign of the low-frequency DCT coefficients
+    of a downscaled grayscale image relative to their median, packed into an int.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    gray = cv2.resize(gray, (hash_size * 4, hash_size * 4), interpolation=cv2.INTER_AREA)
+    dct = cv2.dct(gray.astype(np.float32))[:hash_size, :hash_size]
+    bits = (dct > np.median(dct)).flatten()
+    return int(''.join('1' if b else '0' for b in bits), 2)
+
+
+def hamming(a: int, b: int) -> int:
+    """
+    """
+    return (a ^ b).bit_count()
+
+
+class UnionFind:
+    """
+    """
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        i, j = self.find(i), self.find(j)
+        if i != j:
+            self.parent[max(i, j)] = min(i, j)
+
+
+def lsh_candidates(embeds: torch.Tensor, bits=12, bands=16, seed=0) -> set[tuple[int, int]]:
+    """
+    Candidate near-duplicate pairs from random hyperplane LSH on (normalized) embeddings.
+    Each band hashes `bits` hyperplane signs; rows sharing a bucket in any band are candidates.
+
+    A pair at cosine similarity 0.95 agrees on each sign with probability ~0.90, so the defaults find
+    it with probability 1 - (1 - 0.9^12)^16 ~ 0.995, while unrelated pairs collide in ~0.4% of cases.
+    """
+    generator = torch.Generator().manual_seed(seed)
+    planes = torch.randn(bands * bits, embeds.shape[1], generator=generator, dtype=embeds.dtype)
+    signs = (embeds @ planes.T > 0).reshape(len(embeds), bands, bits).numpy()
+
+    candidates = set()
+    for band in range(bands):
+        buckets = {}
+        for i, key in enumerate(map(bytes, np.packbits(signs[:, band], axis=1))):
+            buckets.setdefault(key, []).append(i)
+        for members in buckets.values():
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    candidates.add((members[a], members[b]))
+    return candidates
+
+
+def cluster(embeds: dict[str, torch.Tensor], hashes: dict[str, list[int]], threshold=0.95) -> dict[str, int]:
+    """
+    Assign a cluster id to every clip.
+
+    Clips with identical perceptual hash sequences and identical file contents are exact duplicates;
+    only one of them needs an entry in `embeds`. Embedded clips are grouped when an LSH candidate pair has cosine similarity
+    of at least `threshold`. Cluster ids are the position of the cluster's first clip in `embeds`.
+
+    Args:
+        embeds (dict[str, torch.Tensor]): Clip embeddings keyed by filename.
+        hashes (dict[str, list[int]]): Perceptual hashes keyed by filename, for all clips.
+        threshold (float): Minimum cosine similarity for near-duplicates.
+
+    Returns:
+        dict[str, int]: Cluster id for every filename in `embeds` and `hashes`.
+    """
+    filenames = list(embeds.keys())
+    clusters = {}
+    if filenames:
+        matrix = torch.stack([embeds[k] for k in filenames]).float()
+        matrix = matrix / matrix.norm(dim=-1, keepdim=True)
+
+        components = UnionFind(len(filenames))
+        for i, j in lsh_candidates(matrix):
+            if (matrix[i] @ matrix[j]).item() >= threshold:
+                components.union(i, j)
+        clusters = {k: components.find(i) for i, k in enumerate(filenames)}
+
+    # Exact duplicates inherit the cluster of the embedded clip with the same signature.
+    signatures = {tuple(hashes[k]): clusters[k] for k in filenames if k in hashes}
+    for k, v in hashes.items():
+        if k not in clusters:
+            clusters[k] = signatures.get(tuple(v), len(filenames) + len(clusters))
+    return clusters
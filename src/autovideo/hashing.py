@@ -0,0 +1,27 @@
+import os
+import hashlib
+from pathlib import Path
+
+
+_hashes: dict[tuple, str] = {}
+
+
+def hash_content(path: Path | str, block_size=1 << 20) -> str:
+    """
+    Content hash of a media file from its size and its first and last `block_size` bytes,
+    memoized on (path, size, mtime) so repeated calls do not touch the file.
+
+    Hashing whole multi-gigabyte clips would cost as much disk I/O as serving them, and the
+    container header and trailer (sample tables included) already change whenever the content does.
+    """
+    stat = os.stat(path)
+    memo = (str(path), stat.st_size, stat.st_mtime, block_size)
+    if memo not in _hashes:
+        digest = hashlib.sha256(str(stat.st_size).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read(block_size))
+            if stat.st_size > block_size:
+                f.seek(max(block_size, stat.st_size - block_size))
+                digest.update(f.read(block_size))
+        _hashes[memo] = digest.hexdigest()[:32]
+    return _hashes[memo]
@@ -0,0 +1,201 @@
+import os
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from autovideo.catalog import probe
+from autovideo.hashing import hash_content
+
+
+def resize(frame: np.ndarray, width: int) -> np.ndarray:
+    """
+    Resize a frame to `width`, keeping aspect ratio with an even height.
+    """
+    height = max(2, 2 * round(frame.shape[0] * width / frame.shape[1] / 2))
+    return cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+
+
+class FrameSample:
+    """
+    Evenly spaced sample of a stream of frames of unknown length, holding at most `2 * size` frames
+    downscaled to `width`. Every `step`-th frame is kept; whenever the buffer fills up, every other
+    kept frame is dropped and `step` doubles.
+    """
+    def __init__(self, size: int, width: int):
+        """
+        """
+        self.size = size
+        self.width = width
+        self.step = 1
+        self.count = 0
+        self.frames: list[np.ndarray] = []
+
+    def add(self, frame: np.ndarray):
+        """
+        """
+        if self.count % self.step == 0:
+            self.frames.append(resize(frame, self.width))
+            if len(self.frames) == 2 * self.size:
+                self.frames = self.frames[::2]
+                self.step *= 2
+        self.count += 1
+
+
+class PreviewCache:
+    """
+    Poster JPEGs and hover sprite sheets for library clips, generated once per clip content hash.
+
+    Previews are rendered either by ffmpeg (one keyframe-only call produces both images) or, during
+    indexing, from frames the indexer already decoded (see `from_frames`).
+    """
+    def __init__(self, cache_dir: Path | str = 'assets/cache/previews', width=320, tile_width=160, columns=5, rows=2, max_workers=4):
+        """
+        """
+        self.cache_dir = Path(cache_dir)
+        self.width = width
+        self.tile_width = tile_width
+        self.columns = columns
+        self.rows = rows
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = threading.Lock()
+        self.locks: dict[str, threading.Lock] = {}
+
+    def key(self, path: Path | str) -> str:
+        """
+        Content hash of a clip (see `hashing.hash_content`), used to name its previews.
+        """
+        return hash_content(path)
+
+    def paths(self, key: str) -> dict[str, Path]:
+        """
+        """
+        return {
+            'poster': self.cache_dir / f'{key}-poster.jpg',
+            'sprite': self.cache_dir / f'{key}-sprite.jpg',
+        }
+
+    def lock_for(self, key: str) -> threading.Lock:
+        """
+        Per-clip lock, so only one thread renders a given clip and the others wait and reuse its output.
+        """
+        with self.lock:
+            return self.locks.setdefault(key, threading.Lock())
+
+    def tmp_path(self, output: Path) -> str:
+        """
+        Unique temporary file next to `output`, renamed over it once fully written.
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{output.stem}.", suffix=".jpg")
+        os.close(fd)
+        return tmp
+
+    def get(self, path: Path | str, kind: str) -> tuple[Path, str]:
+        """
+        Return the (path, key) of the `kind` preview ('poster' or 'sprite') of a clip, generating it if needed.
+        """
+        key = self.key(path)
+        outputs = self.paths(key)
+        if not outputs[kind].exists():
+            with self.lock_for(key):
+                if not outputs[kind].exists():
+                    self.generate(path, key)
+        return outputs[kind], key
+
+    def generate(self, path: Path | str, key: str):
+        """
+        Render poster and sprite sheet of a clip with ffmpeg, decoding keyframes only.
+        Raises RuntimeError if ffmpeg produced no image.
+        """
+        outputs = self.paths(key)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tiles = self.columns * self.rows
+        duration = probe(path)['duration'] or 1.0
+        tmps = {kind: self.tmp_path(output) for kind, output in outputs.items()}
+
+        # The sprite tiles `tiles` frames sampled evenly (a short clip leaves the last tiles blank); at the end
+        # of the clip the fps filter passes its last frame on, so a single keyframe still makes a tile.
+        # The poster is read from a second input seeked to the midpoint. Without accurate seeking, decoding
+        # starts at the last keyframe at or before the seek point instead of dropping the frames before it;
+        # that keyframe's timestamp is still before the seek point, so it is reset to zero to keep it from
+        # being dropped on output. The poster thus exists even for a clip whose only keyframe is its first frame.
+        filter_complex = (
+            f"[0:v]fps={tiles}/{duration}:eof_action=pass,scale={self.tile_width}:-2,tile={self.columns}x{self.rows}[sprite];"
+            f"[1:v]setpts=PTS-STARTPTS,scale={self.width}:-2[poster]"
+        )
+        cmd = [
+            "ffmpeg", "-y", "-v", "error",
+            "-skip_frame", "nokey", "-i", str(path),
+            "-skip_frame", "nokey", "-ss", str(duration / 2), "-noaccurate_seek", "-i", str(path),
+            "-filter_complex", filter_complex,
+            "-map", "[poster]", "-frames:v", "1", "-update", "1", "-q:v", "4", tmps['poster'],
+            "-map", "[sprite]", "-frames:v", "1", "-update", "1", "-q:v", "5", tmps['sprite'],
+        ]
+        try:
+            subprocess.run(cmd, check=True)
+            for kind, output in outputs.items():
+                if not os.path.getsize(tmps[kind]):
+                    raise RuntimeError(f"ffmpeg produced no {kind} for {path}")
+                os.replace(tmps[kind], output)
+        finally:
+            for tmp in tmps.values():
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+    def from_frames(self, path: Path | str, frames: list[np.ndarray]):
+        """
+        Write poster and sprite sheet of a clip from BGR frames sampled evenly through it (see `sample`),
+        so the indexer can produce previews from the frames it already decodes.
+        """
+        if not frames:
+            return
+        key = self.key(path)
+        outputs = self.paths(key)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        n = self.columns * self.rows
+        samples = [frames[i * len(frames) // n] for i in range(n)] if len(frames) >= n else frames
+
+        poster = resize(samples[len(samples) // 2], self.width)
+        tiles = [resize(frame, self.tile_width) for frame in samples]
+        tiles += [np.zeros_like(tiles[0])] * (n - len(tiles))
+        sprite = np.vstack([np.hstack(tiles[r * self.columns:(r + 1) * self.columns]) for r in range(self.rows)])
+
+        with self.lock_for(key):
+            for output, image in [(outputs['poster'], poster), (outputs['sprite'], sprite)]:
+                tmp = self.tmp_path(output)
+                try:
+                    cv2.imwrite(tmp, image, [cv2.IMWRITE_JPEG_QUALITY, 80])
+                    os.replace(tmp, output)
+                finally:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+
+    def sample(self) -> FrameSample:
+        """
+        Bounded sample of tile-sized frames for `from_frames`, so callers decoding a long clip
+        only buffer a few small frames.
+        """
+        return FrameSample(self.columns * self.rows, self.tile_width)
+
+    def warm(self, paths: list[Path | str]):
+        """
+        Generate missing previews for `paths` in the background, `max_workers` clips at a time.
+        """
+        def run(path):
+            try:
+                self.get(path, 'sprite')
+            except Exception as e:
+                print(f"Error generating preview for {path}: {str(e)}")
+
+        for path in paths:
+            self.executor.submit(run, path)
+
+
+if __name__ == '__main__':
+    previews = PreviewCache()
+    print(previews.get("assets/data/IMG_1484.mp4", 'poster'))
+    print(previews.get("assets/data/IMG_1484.mp4", 'sprite'))
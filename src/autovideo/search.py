@@ -7,16 +7,18 @@ from omegaconf import OmegaConf
 
 from autovideo.data.process import compute_embed
 from autovideo.models.clip import ModelClip, DEFAULT_NEGATIVES
+from autovideo.text_index import TextIndex
 
 
 class SearchEngine:
     """
     """
-    def __init__(self, path: Path | str, topk=5):
+    def __init__(self, path: Path | str, topk=5, candidates=100, model: ModelClip = None):
         """
         """
-        self.model = ModelClip(OmegaConf.create({'name': 'ViT-B/16', 'temperature': 0.1}))
+        self.model = model or ModelClip(OmegaConf.create({'name': 'ViT-B/16', 'temperature': 0.1}))
         self.topk = topk
+        self.candidates = candidates
         with open(Path(path) / "embeds.pkl", "rb") as f:
             embeds_dict = pickle.load(f)
         self.embeds = []
@@ -25,12 +27,44 @@ class SearchEngine:
             self.embed_filenames.append(k)
             self.embeds.append(v)
         self.embeds = torch.stack(self.embeds)
+        self.embed_indices = {k: i for i, k in enumerate(self.embed_filenames)}
 
-    def search_text(self, text: str) -> list[str]:
+        # Optional near-duplicate cluster ids, built by autovideo.data.process. Clips without one form their own cluster.
+        clusters_path = Path(path) / "clusters.pkl"
+        clusters = {}
+        if clusters_path.exists():
+            with open(clusters_path, "rb") as f:
+                clusters = pickle.load(f)['clusters']
+        self.clusters = [clusters.get(k, -1 - i) for i, k in enumerate(self.embed_filenames)]
+
+        # Optional keyword index over transcripts and captions, built by autovideo.data.process.
+        text_index_path = Path(path) / "text_index.pkl"
+        self.text_index = TextIndex.load(text_index_path) if text_index_path.exists() else None
+        # Clips indexed after the text index was built have no text yet; they are always dense-scanned.
+        self.unindexed = [] if self.text_index is None else [
+            i for i, k in enumerate(self.embed_filenames) if k not in self.text_index
+        ]
+
+    def search_text(self, text: str, hybrid=True) -> list[str]:
         """
+        Search clips by text. With `hybrid`, clips whose transcripts or captions match the prompt
+        are retrieved from the keyword index first and only those candidates are re-ranked by CLIP
+        similarity; prompts without keyword matches fall back to a dense scan of the whole library.
         """
         embed = self.model.encode_text(text)
-        return [self.embed_filenames[i] for i in self.search(embed, self.topk)]
+        indices = self.search_candidates(text) if hybrid else None
+        return [self.embed_filenames[i] for i in self.search(embed, self.topk, indices=indices)]
+
+    def search_candidates(self, text: str) -> list[int] | None:
+        """
+        Return embedding indices of the top keyword matches for `text` plus all clips missing from the
+        keyword index, or None if nothing matches.
+        """
+        if self.text_index is None:
+            return None
+        matches = self.text_index.search(text, limit=self.candidates)
+        indices = [self.embed_indices[k] for k, _ in matches if k in self.embed_indices]
+        return indices + self.unindexed if indices else None
 
     def search_video(self, path: Path | str, threshold=0.51) -> list[str]:
         """
@@ -38,7 +72,7 @@ class SearchEngine:
         embed = compute_embed(path, self.model).unsqueeze(0)
         return [self.embed_filenames[i] for i in self.search(embed, self.topk, threshold=threshold)]
 
-    def search(self, query_embed: torch.Tensor, topk: int, negatives: list[str] = DEFAULT_NEGATIVES, threshold=0) -> list[int]:
+    def search(self, query_embed: torch.Tensor, topk: int, negatives: list[str] = DEFAULT_NEGATIVES, threshold=0, indices: list[int] = None) -> list[int]:
         """
         Perform nearest neighbor search, ensuring that negative embeddings are accounted for.
 
@@ -46,12 +80,14 @@ class SearchEngine:
             query_embed (torch.Tensor): Query embedding of shape (1, D).
             topk (int): Number of top matches to return.
             negatives (list[str]): List of negative text prompts.
+            indices (list[int]): Optional candidate subset to search instead of the whole library.
 
         Returns:
-            list[int]: Indices of the top-k most relevant videos.
+            list[int]: Indices of the top-k most relevant videos, at most one per near-duplicate cluster.
         """
+        embeds = self.embeds if indices is None else self.embeds[indices]
         query_embed = query_embed / query_embed.norm(dim=-1, keepdim=True)
-        embeds_norm = self.embeds / self.embeds.norm(dim=-1, keepdim=True)
+        embeds_norm = embeds / embeds.norm(dim=-1, keepdim=True)
 
         similarity = torch.matmul(embeds_norm, query_embed.T).squeeze(1)
 
@@ -61,8 +97,20 @@ class SearchEngine:
         refined_similarity = similarity - negative_similarity
         print(refined_similarity)
 
-        topk_indices = torch.topk(refined_similarity, topk, largest=True).indices
-        return [i for i in topk_indices if refined_similarity[i] > threshold]
+        if indices is None:
+            indices = range(len(self.embeds))
+
+        # Walk the ranking and keep only the best clip of each near-duplicate cluster.
+        topk_indices, seen = [], set()
+        for i in torch.argsort(refined_similarity, descending=True).tolist():
+            if len(topk_indices) == topk or refined_similarity[i] <= threshold:
+                break
+            cluster = self.clusters[indices[i]]
+            if cluster in seen:
+                continue
+            seen.add(cluster)
+            topk_indices.append(indices[i])
+        return topk_indices
     
 
 if __name__ == '__main__':
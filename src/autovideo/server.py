@@ -1,13 +1,16 @@
 import os
 import time
 import random
+import threading
 from pathlib import Path
 
 from flask import Flask, send_file, jsonify, request
 from flask_cors import CORS, cross_origin
 from glob import glob
 
+from autovideo.catalog import Catalog, Watcher, Indexer
 from autovideo.data.loaders import concat
+from autovideo.preview import PreviewCache
 from autovideo.search import SearchEngine
 from autovideo.summarize import SummaryEngine
 from autovideo.bgm import add_bgm_to_video
@@ -24,6 +27,46 @@ CORS(app, resources={
 engine = SearchEngine("assets/data", topk=3)
 engine_summarize = SummaryEngine()
 
+def swap_engine():
+    # Build the new engine off to the side and swap the reference so in-flight searches are unaffected.
+    global engine
+    engine = SearchEngine("assets/data", topk=3, model=engine.model)
+
+previews = PreviewCache("assets/cache/previews")
+catalog = None
+indexer = None
+services_lock = threading.Lock()
+
+def on_catalog_change(filenames):
+    # Clips picked up by the indexer get their previews from its decode pass; render the rest with ffmpeg.
+    queued = [f for f in filenames if indexer.put(f)]
+    previews.warm([f for f in filenames if f not in queued and os.path.exists(f)])
+
+@app.before_request
+def start_services():
+    """
+    Start the background indexer, catalog watcher and preview warm-up, once per process.
+    Runs before the first request, so the services live in the process that serves requests
+    (not in a reloader parent) under `flask run` and WSGI servers alike. Serve with a single
+    worker process: two indexers would embed the same clips and race on the index files.
+    """
+    global catalog, indexer
+    if catalog is not None:
+        return
+    with services_lock:
+        if catalog is not None:
+            return
+        indexer = Indexer("assets/data", on_update=swap_engine, model=engine.model, previews=previews, text=True)
+        new_catalog = Catalog(["assets/data", "assets/data-reference"], "assets/catalog.json")
+        queued = set(indexer.sync(new_catalog.entries))
+        indexer.start()
+        previews.warm([k for k in new_catalog.entries if k not in queued])
+        Watcher(new_catalog, on_catalog_change).start()
+        catalog = new_catalog
+
+PREVIEW_DIRECTORIES = {'data': 'assets/data', 'data-reference': 'assets/data-reference'}
+PREVIEW_MAX_AGE = 365 * 24 * 60 * 60
+
 @app.route('/video/<name>')
 def serve_video(name):
     response = send_file(f'assets/data/{name}', mimetype='video/mp4')
@@ -32,13 +75,46 @@ def serve_video(name):
     response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
     return response
 
+def list_page(directory: str):
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', 50, type=int)
+    page = catalog.list(directory, offset=max(offset, 0), limit=min(max(limit, 1), 500))
+    collection = os.path.basename(directory)
+    # Preview URLs are versioned by mtime so the long-lived browser cache is bypassed when a clip is replaced.
+    page['videos'] = [{
+        **video,
+        'poster': f"/preview/poster/{collection}/{video['name']}?v={int(video['mtime'])}",
+        'sprite': f"/preview/sprite/{collection}/{video['name']}?v={int(video['mtime'])}",
+    } for video in page['videos']]
+    return jsonify(page)
+
+@app.route('/preview/<kind>/<collection>/<name>')
+def serve_preview(kind, collection, name):
+    if kind not in ('poster', 'sprite') or collection not in PREVIEW_DIRECTORIES or name != os.path.basename(name):
+        return jsonify({"error": "Preview not found"}), 404
+    path = os.path.join(PREVIEW_DIRECTORIES[collection], name)
+    if not os.path.isfile(path):
+        return jsonify({"error": "Preview not found"}), 404
+    try:
+        preview, key = previews.get(path, kind)
+    except Exception as e:
+        print(f"Error generating preview: {str(e)}")
+        return jsonify({
+            "error": str(e),
+            "message": "Failed to generate preview"
+        }), 500
+    response = send_file(preview, mimetype='image/jpeg', etag=f"{key}-{kind}", max_age=PREVIEW_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={PREVIEW_MAX_AGE}'
+    response.headers['Access-Control-Allow-Origin'] = 'http://localhost:5173'
+    return response
+
 @app.route('/list-videos')
 def list_videos():
-    return jsonify(list(glob.glob('assets/data/*')))
+    return list_page('assets/data')
 
 @app.route('/list-videos-trending')
 def list_videos_trending():
-    return jsonify(list(glob.glob('assets/data-reference/*')))
+    return list_page('assets/data-reference')
 
 def search_text(text: str) -> list[Path | str]:
     return engine.search_text(text)
@@ -141,4 +217,6 @@ def create_videos():
 
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # Start indexing right away instead of on the first request.
+    start_services()
+    app.run(debug=True, use_reloader=False)
\ No newline at end of file
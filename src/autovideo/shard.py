@@ -0,0 +1,357 @@
+import os
+import heapq
+import pickle
+import hashlib
+import secrets
+import threading
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Listener, Client
+
+import torch
+from omegaconf import OmegaConf
+
+from autovideo.catalog import save_atomic
+from autovideo.data.process import compute_embed
+from autovideo.models.clip import ModelClip, DEFAULT_NEGATIVES
+from autovideo.text_index import TextIndex
+
+
+AUTHKEY_ENV = 'AUTOVIDEO_SHARD_AUTHKEY'
+
+
+def resolve_authkey(authkey: bytes = None) -> bytes:
+    """
+    Return `authkey`, or the key in the AUTOVIDEO_SHARD_AUTHKEY environment variable.
+
+    Shard RPC unpickles every request, so anyone holding the key can run code on a shard;
+    there is deliberately no built-in default.
+    """
+    if authkey is None and os.environ.get(AUTHKEY_ENV):
+        authkey = os.environ[AUTHKEY_ENV].encode()
+    if not authkey:
+        raise ValueError(f"A shard authkey is required: pass authkey or set {AUTHKEY_ENV}.")
+    return authkey
+
+
+def shard_of(filename: str, n_shards: int) -> int:
+    """
+    Stable shard assignment of a clip (independent of PYTHONHASHSEED).
+    """
+    return int.from_bytes(hashlib.md5(filename.encode()).digest()[:8], 'little') % n_shards
+
+
+def shard_path(path: Path | str, i: int) -> Path:
+    """
+    """
+    return Path(path) / "shards" / f"shard_{i}.pkl"
+
+
+def load_clusters(path: Path | str) -> dict[str, int]:
+    """
+    """
+    clusters_path = Path(path) / "clusters.pkl"
+    if not clusters_path.exists():
+        return {}
+    with open(clusters_path, "rb") as f:
+        return pickle.load(f)['clusters']
+
+
+def partition(path: Path | str, n_shards: int) -> list[Path]:
+    """
+    Split the library index in `path` into `n_shards` shard files under `path/shards`.
+    `embeds.pkl` is the source of truth, so re-partitioning picks up clips added or removed since
+    the last call; existing shard files are only read when `embeds.pkl` is absent. Calling this
+    again with a different `n_shards` rebalances the library. Each shard also records which of its
+    clips are missing from `text_index.pkl`, so hybrid searches still dense-scan them.
+    Shard files are replaced atomically, so live shards can reload while this runs.
+
+    Returns:
+        list[Path]: Paths of the shard files.
+    """
+    path = Path(path)
+    embeds = {}
+    existing = sorted((path / "shards").glob("shard_*.pkl"))
+    if (path / "embeds.pkl").exists():
+        with open(path / "embeds.pkl", "rb") as f:
+            embeds = pickle.load(f)
+    else:
+        for shard in existing:
+            with open(shard, "rb") as f:
+                embeds.update(pickle.load(f)['embeds'])
+    clusters = load_clusters(path)
+    text_index = TextIndex.load(path / "text_index.pkl") if (path / "text_index.pkl").exists() else None
+
+    shards = [{'embeds': {}, 'clusters': {}, 'unindexed': []} for _ in range(n_shards)]
+    for k, v in embeds.items():
+        shard = shards[shard_of(k, n_shards)]
+        shard['embeds'][k] = v
+        if k in clusters:
+            shard['clusters'][k] = clusters[k]
+        if text_index is not None and k not in text_index:
+            shard['unindexed'].append(k)
+
+    (path / "shards").mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i, shard in enumerate(shards):
+        paths.append(shard_path(path, i))
+        save_atomic(paths[-1], shard)
+    for stale in existing:
+        if stale not in paths:
+            stale.unlink()
+    return paths
+
+
+class Shard:
+    """
+    One partition of the embedding matrix. Scores queries against its rows only.
+    """
+    def __init__(self, path: Path | str):
+        """
+        """
+        self.path = Path(path)
+        self.reload()
+
+    def reload(self) -> int:
+        """
+        (Re)load the shard file, e.g. after `partition` rebalanced the library.
+        """
+        with open(self.path, "rb") as f:
+            shard = pickle.load(f)
+        self.filenames = list(shard['embeds'].keys())
+        self.indices = {k: i for i, k in enumerate(self.filenames)}
+        self.clusters = [shard['clusters'].get(k, k) for k in self.filenames]
+        self.unindexed = [self.indices[k] for k in shard['unindexed']]
+        if self.filenames:
+            embeds = torch.stack([shard['embeds'][k] for k in self.filenames]).float()
+            self.embeds = embeds / embeds.norm(dim=-1, keepdim=True)
+        else:
+            self.embeds = torch.zeros(0, ModelClip.EMBEDDING_DIM)
+        return len(self.filenames)
+
+    def search(self, query_embed: torch.Tensor, negative_embeds: torch.Tensor, topk: int, threshold=0, filenames: list[str] = None) -> list[tuple[float, str, int | str]]:
+        """
+        Score this shard and return its top-k as (score, filename, cluster), one entry per cluster.
+        Scores match `SearchEngine.search`: query similarity minus mean negative similarity.
+        Keyword candidates in `filenames` are searched together with the clips missing from the
+        text index, as in `SearchEngine.search_candidates`.
+        """
+        indices = None
+        if filenames is not None:
+            indices = [self.indices[k] for k in filenames if k in self.indices] + self.unindexed
+            if not indices:
+                return []
+        embeds = self.embeds if indices is None else self.embeds[indices]
+        if indices is None:
+            indices = range(len(self.filenames))
+
+        query_embed = query_embed.float() / query_embed.norm(dim=-1, keepdim=True)
+        similarity = torch.matmul(embeds, query_embed.T).squeeze(1)
+        negative_similarity = torch.matmul(embeds, negative_embeds.float().T).mean(dim=1)
+        refined_similarity = similarity - negative_similarity
+
+        results, seen = [], set()
+        for i in torch.argsort(refined_similarity, descending=True).tolist():
+            score = refined_similarity[i].item()
+            if len(results) == topk or score <= threshold:
+                break
+            cluster = self.clusters[indices[i]]
+            if cluster in seen:
+                continue
+            seen.add(cluster)
+            results.append((score, self.filenames[indices[i]], cluster))
+        return results
+
+
+def serve(path: Path | str, port: int, host='127.0.0.1', authkey: bytes = None, ready=None):
+    """
+    Serve a shard over `multiprocessing.connection` RPC. Each request is a (method, kwargs)
+    tuple and each reply is ('ok', result) or ('error', message). Runs until a 'close' request.
+    With `port=0` the OS picks a free port; the bound address is sent over the `ready` connection, if given.
+
+    Requests are unpickled, so the listener binds to loopback by default; only pass a public `host`
+    on a trusted network, with a secret `authkey` shared by the nodes.
+    """
+    authkey = resolve_authkey(authkey)
+    address = (host, port)
+    shard = Shard(path)
+    # Connections are handled on their own threads; the lock keeps searches from seeing a half-done reload.
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def handle(conn):
+        with conn:
+            while not stop.is_set():
+                try:
+                    method, kwargs = conn.recv()
+                except EOFError:
+                    return
+                if method == 'close':
+                    stop.set()
+                    conn.send(('ok', None))
+                    # Wake the accept loop so the server can exit.
+                    Client(address, authkey=authkey).close()
+                    return
+                try:
+                    with lock:
+                        conn.send(('ok', getattr(shard, method)(**kwargs)))
+                except Exception as e:
+                    conn.send(('error', f"{type(e).__name__}: {e}"))
+
+    with Listener(address, authkey=authkey) as listener:
+        address = listener.address
+        if ready is not None:
+            ready.send(address)
+            ready.close()
+        while not stop.is_set():
+            threading.Thread(target=handle, args=(listener.accept(),), daemon=True).start()
+
+
+class ShardClient:
+    """
+    Connection to a shard served by `serve`, on this machine or another node.
+    """
+    def __init__(self, address: tuple[str, int], authkey: bytes = None):
+        """
+        """
+        self.address = address
+        self.conn = Client(address, authkey=resolve_authkey(authkey))
+        self.lock = threading.Lock()
+
+    def call(self, method: str, **kwargs):
+        """
+        """
+        with self.lock:
+            self.conn.send((method, kwargs))
+            status, result = self.conn.recv()
+        if status != 'ok':
+            raise RuntimeError(f"Shard {self.address} failed: {result}")
+        return result
+
+    def close(self):
+        """
+        """
+        try:
+            self.call('close')
+        finally:
+            self.conn.close()
+
+
+class ShardedSearchEngine:
+    """
+    Scatter-gather version of `SearchEngine`: queries are encoded once, fanned out to every shard
+    in parallel and the per-shard top-k lists are merged into a global top-k.
+    """
+    def __init__(self, path: Path | str, addresses: list[tuple[str, int]], topk=5, candidates=100, model: ModelClip = None, authkey: bytes = None):
+        """
+        """
+        self.model = model or ModelClip(OmegaConf.create({'name': 'ViT-B/16', 'temperature': 0.1}))
+        self.topk = topk
+        self.candidates = candidates
+        self.shards = [ShardClient(address, authkey) for address in addresses]
+        self.executor = ThreadPoolExecutor(max_workers=len(self.shards))
+
+        text_index_path = Path(path) / "text_index.pkl"
+        self.text_index = TextIndex.load(text_index_path) if text_index_path.exists() else None
+
+    def search_text(self, text: str, hybrid=True) -> list[str]:
+        """
+        """
+        embed = self.model.encode_text(text)
+        filenames = None
+        if hybrid and self.text_index is not None:
+            filenames = [k for k, _ in self.text_index.search(text, limit=self.candidates)] or None
+        return self.search(embed, self.topk, filenames=filenames)
+
+    def search_video(self, path: Path | str, threshold=0.51) -> list[str]:
+        """
+        """
+        embed = compute_embed(path, self.model).unsqueeze(0)
+        return self.search(embed, self.topk, threshold=threshold)
+
+    def search(self, query_embed: torch.Tensor, topk: int, negatives: list[str] = DEFAULT_NEGATIVES, threshold=0, filenames: list[str] = None) -> list[str]:
+        """
+        Fan the query out to all shards and merge their top-k lists, keeping one clip per cluster.
+        """
+        kwargs = {
+            'query_embed': query_embed.cpu(),
+            'negative_embeds': self.model.encode_text(negatives).cpu(),
+            'topk': topk,
+            'threshold': threshold,
+            'filenames': filenames,
+        }
+        results = self.executor.map(lambda shard: shard.call('search', **kwargs), self.shards)
+
+        merged, seen = [], set()
+        for score, filename, cluster in heapq.merge(*results, key=lambda x: -x[0]):
+            if len(merged) == topk:
+                break
+            if cluster in seen:
+                continue
+            seen.add(cluster)
+            merged.append(filename)
+        return merged
+
+    def reload(self) -> int:
+        """
+        Reload every shard file after a rebalance. Returns the total number of clips served.
+        """
+        return sum(self.executor.map(lambda shard: shard.call('reload'), self.shards))
+
+    def close(self):
+        """
+        """
+        for shard in self.shards:
+            shard.close()
+        self.executor.shutdown()
+
+
+def launch_local(path: Path | str, n_shards: int, port=6000, authkey: bytes = None, timeout=30.0) -> tuple[list[multiprocessing.Process], list[tuple[str, int]], bytes]:
+    """
+    Partition the library in `path` and serve each shard from its own worker process on loopback,
+    on ports `port`, `port + 1`, ... or, with `port=0`, on free ports picked by the OS.
+    Useful for testing the sharded setup end to end. Without an `authkey` (argument or environment)
+    a random one is generated. Waits until every shard accepts connections.
+
+    Returns:
+        tuple: Worker processes, shard addresses and the authkey to pass to `ShardedSearchEngine`.
+    """
+    if authkey is None and not os.environ.get(AUTHKEY_ENV):
+        authkey = secrets.token_bytes(32)
+    authkey = resolve_authkey(authkey)
+    paths = partition(path, n_shards)
+    pipes = [multiprocessing.Pipe(duplex=False) for _ in paths]
+    processes = [
+        multiprocessing.Process(target=serve, args=(shard, port + i if port else 0), kwargs={'authkey': authkey, 'ready': send}, daemon=True)
+        for i, (shard, (_, send)) in enumerate(zip(paths, pipes))
+    ]
+    for process in processes:
+        process.start()
+
+    addresses = []
+    for i, (receive, send) in enumerate(pipes):
+        # Close our copy of the sending end so a worker that dies before binding shows up as EOF.
+        send.close()
+        try:
+            if not receive.poll(timeout):
+                raise TimeoutError
+            addresses.append(tuple(receive.recv()))
+        except (EOFError, TimeoutError):
+            raise ConnectionRefusedError(f"Shard {i} did not start")
+    return processes, addresses, authkey
+
+
+if __name__ == '__main__':
+    processes, addresses, authkey = launch_local("assets/data", n_shards=4)
+    engine = ShardedSearchEngine("assets/data", addresses, authkey=authkey)
+    print(engine.search_text("mountain"))
+
+    # Rebalance onto 2 shards: rewrite the shard files, then restart the workers on them.
+    engine.close()
+    for process in processes:
+        process.join()
+    processes, addresses, authkey = launch_local("assets/data", n_shards=2, authkey=authkey)
+    engine = ShardedSearchEngine("assets/data", addresses, model=engine.model, authkey=authkey)
+    print(engine.search_text("mountain"))
+    engine.close()
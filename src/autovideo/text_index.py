@@ -0,0 +1,123 @@
+import os
+import re
+import math
+import pickle
+import tempfile
+from pathlib import Path
+from collections import Counter, defaultdict
+
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i in is it its me my of on or our she so
+that the their them they this to was we were what when where which who will with you your
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lowercase, split on non-word characters and drop stopwords.
+    """
+    return [t for t in re.findall(r"\w+", text.lower()) if t not in STOPWORDS]
+
+
+class TextIndex:
+    """
+    On-disk BM25 inverted index over per-clip text (transcripts and generated captions).
+
+    Only the posting lists of the query terms are touched at query time, so the cost of a
+    selective query depends on how many clips mention its terms rather than on library size.
+    """
+    def __init__(self, k1=1.2, b=0.75):
+        """
+        """
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, dict[str, int]] = defaultdict(dict)
+        self.terms: dict[str, list[str]] = {}
+        self.lengths: dict[str, int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def __contains__(self, filename: str) -> bool:
+        return filename in self.lengths
+
+    def add(self, filename: str, text: str):
+        """
+        Index `text` under `filename`, replacing any previous text for that file.
+        """
+        self.remove(filename)
+        tokens = tokenize(text)
+        counts = Counter(tokens)
+        for term, count in counts.items():
+            self.postings[term][filename] = count
+        self.terms[filename] = list(counts)
+        self.lengths[filename] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, filename: str):
+        """
+        Drop `filename` from the index, touching only the posting lists of its own terms.
+        """
+        if filename not in self.lengths:
+            return
+        self.total_length -= self.lengths.pop(filename)
+        for term in self.terms.pop(filename):
+            del self.postings[term][filename]
+            if not self.postings[term]:
+                del self.postings[term]
+
+    def search(self, text: str, limit: int = None) -> list[tuple[str, float]]:
+        """
+        Score clips against `text` with BM25.
+
+        Returns:
+            list[tuple[str, float]]: (filename, score) pairs sorted by descending score,
+                                     containing only clips that match at least one query term.
+        """
+        n = len(self.lengths)
+        if not n:
+            return []
+        average_length = self.total_length / n
+
+        scores = defaultdict(float)
+        for term in set(tokenize(text)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for filename, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[filename] / average_length)
+                scores[filename] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        return ranked[:limit] if limit else ranked
+
+    def save(self, path: Path | str):
+        """
+        Pickle the index to a temporary file and rename it over `path`, so readers never see a partial index.
+        """
+        path = Path(path)
+        with tempfile.NamedTemporaryFile("wb", dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False) as f:
+            pickle.dump({
+                'k1': self.k1,
+                'b': self.b,
+                'postings': dict(self.postings),
+                'terms': self.terms,
+                'lengths': self.lengths,
+            }, f)
+        os.replace(f.name, path)
+
+    @classmethod
+    def load(cls, path: Path | str) -> 'TextIndex':
+        """
+        """
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        index = cls(k1=state['k1'], b=state['b'])
+        index.postings.update(state['postings'])
+        index.terms = state['terms']
+        index.lengths = state['lengths']
+        index.total_length = sum(index.lengths.values())
+        return index
@@ -0,0 +1,220 @@
+import io
+import json
+import wave
+import tempfile
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from openai import OpenAI
+
+from autovideo.hashing import hash_content
+
+
+SAMPLE_RATE = 16000
+
+
+def extract_audio(path: Path | str, output: Path | str = None, sample_rate=SAMPLE_RATE) -> Path:
+    """
+    Extract the audio track of a video as mono 16-bit PCM WAV at `sample_rate` using ffmpeg.
+    """
+    path = Path(path)
+    output = Path(output) if output else path.with_suffix('.wav')
+    cmd = [
+        "ffmpeg", "-y", "-v", "error",
+        "-i", str(path),
+        "-vn",
+        "-ac", "1",
+        "-ar", str(sample_rate),
+        "-c:a", "pcm_s16le",
+        str(output)
+    ]
+    subprocess.run(cmd, check=True)
+    return output
+
+
+def read_wav(path: Path | str) -> tuple[np.ndarray, int]:
+    """
+    Read a mono 16-bit PCM WAV file into an int16 array.
+    """
+    with wave.open(str(path), 'rb') as f:
+        if f.getnchannels() != 1 or f.getsampwidth() != 2:
+            raise ValueError(f'Expected mono 16-bit PCM audio: {path}')
+        samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        return samples, f.getframerate()
+
+
+def encode_wav(samples: np.ndarray, sample_rate=SAMPLE_RATE) -> bytes:
+    """
+    Encode an int16 array as an in-memory WAV file.
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.astype(np.int16).tobytes())
+    return buffer.getvalue()
+
+
+def split_chunks(samples: np.ndarray, sample_rate: int, chunk_seconds=30.0, search_seconds=5.0, frame_seconds=0.02) -> list[int]:
+    """
+    Choose chunk boundaries (in samples) close to every `chunk_seconds`, placing each boundary
+    at the quietest frame within the last `search_seconds` before the target so words are not cut.
+
+    Returns:
+        list[int]: Boundaries including 0 and len(samples).
+    """
+    frame = max(1, int(frame_seconds * sample_rate))
+    n_frames = len(samples) // frame
+    energy = np.sqrt(np.mean(
+        samples[:n_frames * frame].astype(np.float32).reshape(n_frames, frame) ** 2, axis=1
+    )) if n_frames else np.zeros(0)
+
+    chunk = max(1, int(chunk_seconds * sample_rate))
+    # Keep the search window inside the chunk so every boundary moves forward.
+    search = min(int(search_seconds * sample_rate), chunk // 2)
+    boundaries = [0]
+    while len(samples) - boundaries[-1] > chunk:
+        target = boundaries[-1] + chunk
+        lo, hi = (target - search) // frame, target // frame
+        boundary = target
+        if hi > lo:
+            boundary = (lo + int(np.argmin(energy[lo:hi]))) * frame
+        if boundary <= boundaries[-1]:
+            boundary = target
+        boundaries.append(boundary)
+    boundaries.append(len(samples))
+    return boundaries
+
+
+def unpack_segments(response, duration=0.0) -> list[dict]:
+    """
+    Normalize a verbose_json transcription response into a list of {'start', 'end', 'text'} dicts.
+    Responses without segments become a single segment spanning `duration` seconds.
+    """
+    segments = response.get('segments') if isinstance(response, dict) else getattr(response, 'segments', None)
+    if segments is None:
+        text = response.get('text') if isinstance(response, dict) else getattr(response, 'text', '')
+        return [{'start': 0.0, 'end': float(duration), 'text': (text or '').strip()}]
+
+    def get(segment, key):
+        return segment[key] if isinstance(segment, dict) else getattr(segment, key)
+
+    return [
+        {'start': float(get(s, 'start')), 'end': float(get(s, 'end')), 'text': get(s, 'text').strip()}
+        for s in segments
+    ]
+
+
+class TranscriptionEngine:
+    """
+    Transcribes audio by splitting it into overlapping chunks at silence boundaries, sending
+    the chunks concurrently to a Whisper-compatible endpoint and stitching the timestamped
+    segments back together. Results are cached on disk by the content hash of the source file
+    (see `hashing.hash_content`).
+
+    Point `base_url` at a local server implementing `/audio/transcriptions` to run without the OpenAI API.
+    """
+    def __init__(
+        self,
+        model='whisper-1',
+        cache_dir: Path | str = 'assets/cache/transcripts',
+        chunk_seconds=30.0,
+        overlap_seconds=1.0,
+        max_workers=4,
+        base_url: str = None,
+        api_key: str = None,
+    ):
+        """
+        """
+        self.model = model
+        self.cache_dir = Path(cache_dir)
+        self.chunk_seconds = chunk_seconds
+        self.overlap_seconds = overlap_seconds
+        self.max_workers = max_workers
+        self.client = OpenAI(base_url=base_url, api_key=api_key)
+
+    def transcribe(self, path: Path | str) -> dict:
+        """
+        Transcribe a video or audio file. The cache is keyed on the source file, so cache hits
+        skip audio extraction; on a miss, non-WAV inputs are converted with `extract_audio`
+        into a temporary directory that is removed afterwards.
+
+        Returns:
+            dict: {'text': str, 'segments': list of {'start', 'end', 'text'} in seconds}.
+        """
+        path = Path(path)
+        cache_path = self.cache_dir / f'{hash_content(path)}-{self.model}.json'
+        if cache_path.exists():
+            with open(cache_path, 'r') as f:
+                return json.load(f)
+
+        if path.suffix.lower() == '.wav':
+            samples, sample_rate = read_wav(path)
+        else:
+            with tempfile.TemporaryDirectory() as tmp:
+                samples, sample_rate = read_wav(extract_audio(path, Path(tmp) / 'audio.wav'))
+        segments = self.transcribe_samples(samples, sample_rate)
+        transcript = {'text': ' '.join(s['text'] for s in segments if s['text']), 'segments': segments}
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, 'w') as f:
+            json.dump(transcript, f)
+        return transcript
+
+    def transcribe_samples(self, samples: np.ndarray, sample_rate: int) -> list[dict]:
+        """
+        Transcribe raw samples chunk by chunk with at most `max_workers` requests in flight.
+        """
+        if not len(samples):
+            return []
+        boundaries = split_chunks(samples, sample_rate, chunk_seconds=self.chunk_seconds)
+        overlap = int(self.overlap_seconds * sample_rate)
+        chunks = []
+        for lo, hi in zip(boundaries[:-1], boundaries[1:]):
+            start, end = max(0, lo - overlap), min(len(samples), hi + overlap)
+            chunks.append((start, end, lo, hi))
+
+        def run(chunk):
+            start, end, _, _ = chunk
+            return self.transcribe_chunk(encode_wav(samples[start:end], sample_rate), start / sample_rate, (end - start) / sample_rate)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(run, chunks))
+
+        # Each chunk owns the span between its boundaries; segments transcribed in the overlap
+        # are kept only by the chunk whose span contains the segment midpoint.
+        segments = []
+        for (_, _, lo, hi), chunk_segments in zip(chunks, results):
+            last = hi == len(samples)
+            lo, hi = lo / sample_rate, hi / sample_rate
+            for segment in chunk_segments:
+                midpoint = (segment['start'] + segment['end']) / 2
+                if lo <= midpoint and (midpoint < hi or last):
+                    segments.append(segment)
+        return segments
+
+    def transcribe_chunk(self, audio: bytes, offset: float, duration: float) -> list[dict]:
+        """
+        Transcribe one WAV chunk and shift its segment timestamps by `offset` seconds.
+        """
+        response = self.client.audio.transcriptions.create(
+            model=self.model,
+            file=('chunk.wav', audio, 'audio/wav'),
+            response_format='verbose_json',
+            timestamp_granularities=['segment'],
+        )
+        segments = unpack_segments(response, duration)
+        for segment in segments:
+            segment['start'] += offset
+            segment['end'] += offset
+        return segments
+
+
+if __name__ == '__main__':
+    engine = TranscriptionEngine()
+    transcript = engine.transcribe("assets/data/IMG_1484.mp4")
+    for segment in transcript['segments']:
+        print(f"[{segment['start']:.2f} - {segment['end']:.2f}] {segment['text']}")
@@ -0,0 +1,95 @@
+import io
+import json
+import wave
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+SAMPLE_RATE = 16000
+WORD_SECONDS = 0.5
+GAP_SECONDS = 0.5
+
+
+def synthesize(n_words: int, sample_rate=SAMPLE_RATE) -> np.ndarray:
+    """
+    Audio of `n_words` tone bursts separated by silence. Word i has peak amplitude 1000 + 100 * i,
+    so the fake server can tell which word it heard regardless of where a chunk starts.
+    """
+    word, gap = int(WORD_SECONDS * sample_rate), int(GAP_SECONDS * sample_rate)
+    t = np.arange(word) / sample_rate
+    tone = np.sin(2 * np.pi * 440 * t)
+    blocks = []
+    for i in range(n_words):
+        blocks.append(np.round((1000 + 100 * i) * tone))
+        blocks.append(np.zeros(gap))
+    return np.concatenate(blocks).astype(np.int16)
+
+
+def recognize(samples: np.ndarray, sample_rate: int) -> list[dict]:
+    """
+    "Transcribe" audio from `synthesize`: every run of non-silent samples becomes a segment
+    whose text names the word encoded by its amplitude.
+    """
+    loud = np.abs(samples.astype(np.int32)) > 0
+    # Bridge the zero crossings inside a tone so each burst is one run.
+    window = int(0.005 * sample_rate)
+    loud = np.convolve(loud, np.ones(window), mode='same') > 0
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], loud.astype(np.int8), [0]])))
+    segments = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        peak = int(np.abs(samples[start:end].astype(np.int32)).max())
+        segments.append({
+            'id': len(segments),
+            'start': start / sample_rate,
+            'end': end / sample_rate,
+            'text': f" w{round((peak - 1000) / 100)}",
+        })
+    return segments
+
+
+class FakeTranscriptionServer:
+    """
+    Minimal stand-in for the `/audio/transcriptions` endpoint that answers in verbose_json.
+    """
+    def __init__(self):
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                server.requests += 1
+                # The multipart file part is a WAV; its header says how many frames to read.
+                with wave.open(io.BytesIO(body[body.index(b'RIFF'):]), 'rb') as f:
+                    sample_rate = f.getframerate()
+                    samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+                segments = recognize(samples, sample_rate)
+                payload = json.dumps({
+                    'task': 'transcribe',
+                    'language': 'english',
+                    'duration': len(samples) / sample_rate,
+                    'text': ''.join(s['text'] for s in segments).strip(),
+                    'segments': segments,
+                }).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,85 @@
+import os
+import pickle
+
+import pytest
+
+pytest.importorskip("cv2")
+torch = pytest.importorskip("torch")
+
+from autovideo.catalog import Catalog, Indexer
+from autovideo.search import SearchEngine
+from autovideo.text_index import TextIndex
+from test_dedup import CountingModel, write_video
+
+
+def test_sync_queues_new_replaced_and_deleted_clips(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    a = write_video(data / "a.mp4", seed=0)
+    b = write_video(data / "b.mp4", seed=1)
+
+    text_index = TextIndex()
+    text_index.add(a, "beach sunset")
+    text_index.add(b, "snowy mountain")
+    text_index.save(data / "text_index.pkl")
+
+    indexer = Indexer(str(data), on_update=lambda: None, model=CountingModel())
+    indexer.index([a, b])
+    with open(data / "clusters.pkl", "rb") as f:
+        assert set(pickle.load(f)['stats']) == {a, b}
+
+    # While the "server is down": b is replaced under the same name, c is added and a is deleted.
+    write_video(data / "b.mp4", seed=2, n_frames=60)
+    os.utime(b, (0, 0))
+    c = write_video(data / "c.mp4", seed=3)
+    os.remove(a)
+
+    catalog = Catalog([str(data)], tmp_path / "catalog.json")
+    indexer = Indexer(str(data), on_update=lambda: None, model=CountingModel())
+    assert sorted(indexer.sync(catalog.entries)) == sorted([a, b, c])
+
+    indexer.index(sorted([a, b, c]))
+    with open(data / "embeds.pkl", "rb") as f:
+        assert set(pickle.load(f)) == {b, c}
+    text_index = TextIndex.load(data / "text_index.pkl")
+    assert a not in text_index and b not in text_index
+
+    indexer = Indexer(str(data), on_update=lambda: None, model=CountingModel())
+    assert indexer.sync(catalog.entries) == []
+
+
+def test_clips_missing_from_text_index_stay_searchable(tmp_path):
+    embeds = {f"clip{i}.mp4": torch.randn(8) for i in range(4)}
+    with open(tmp_path / "embeds.pkl", "wb") as f:
+        pickle.dump(embeds, f)
+    text_index = TextIndex()
+    text_index.add("clip0.mp4", "mountain")
+    text_index.add("clip1.mp4", "beach")
+    text_index.save(tmp_path / "text_index.pkl")
+
+    engine = SearchEngine(tmp_path, model=CountingModel())
+    # clip2 and clip3 were indexed after the text index was built.
+    assert sorted(engine.search_candidates("mountain")) == [0, 2, 3]
+    assert engine.search_candidates("volcano") is None
+
+
+def test_unreadable_clip_does_not_drop_its_batch(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    a = write_video(data / "a.mp4", seed=0)
+    c = write_video(data / "c.mp4", seed=2)
+    indexer = Indexer(str(data), on_update=lambda: None, model=CountingModel())
+    indexer.index([a, c])
+
+    # "0.mp4" sorts first and is still being copied; a and c are re-queued with it.
+    broken = str(data / "0.mp4")
+    open(broken, "wb").close()
+    b = write_video(data / "b.mp4", seed=1)
+    assert indexer.index([broken, a, b, c]) == [broken]
+
+    with open(data / "embeds.pkl", "rb") as f:
+        assert set(pickle.load(f)) == {a, b, c}
+    with open(data / "clusters.pkl", "rb") as f:
+        assert set(pickle.load(f)['stats']) == {a, b, c}
+    catalog = Catalog([str(data)], tmp_path / "catalog.json")
+    assert indexer.sync(catalog.entries) == [broken]
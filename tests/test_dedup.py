@@ -0,0 +1,95 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+torch = pytest.importorskip("torch")
+
+from autovideo.data.process import compute_embed, compute_embed_hashes
+from autovideo.dedup import cluster, lsh_candidates
+
+
+class CountingModel:
+    """
+    Stand-in for ModelClip: embeds a frame as its per-channel mean and counts calls.
+    """
+    def __init__(self):
+        self.calls = 0
+
+    def encode_image(self, image: torch.Tensor) -> torch.Tensor:
+        self.calls += 1
+        return image.mean(dim=(2, 3))
+
+
+def write_video(path, seed, n_frames=90, size=(64, 48), prefix_seed=None, prefix_frames=0):
+    rngs = [np.random.default_rng(seed if prefix_seed is None else prefix_seed), np.random.default_rng(seed)]
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), 30, size)
+    for i in range(n_frames):
+        rng = rngs[0] if i < prefix_frames else rngs[1]
+        writer.write(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def test_exact_duplicate_is_not_embedded(tmp_path):
+    a = write_video(tmp_path / "a.mp4", seed=0)
+    b = write_video(tmp_path / "b.mp4", seed=0)
+    model = CountingModel()
+
+    embed_a, hashes_a = compute_embed_hashes(a, model)
+    assert embed_a is not None and model.calls == 9
+
+    embed_b, hashes_b = compute_embed_hashes(b, model, {tuple(hashes_a): a})
+    assert embed_b is None and hashes_b == hashes_a
+    assert model.calls == 9
+
+
+def test_same_footage_with_different_contents_is_embedded(tmp_path):
+    a = write_video(tmp_path / "a.mp4", seed=0)
+    b = write_video(tmp_path / "b.mp4", seed=0)
+    # Same frames, different file (as with a different voiceover).
+    with open(b, "ab") as f:
+        f.write(b"\0" * 64)
+    _, hashes_a = compute_embed_hashes(a, CountingModel())
+
+    embed_b, hashes_b = compute_embed_hashes(b, CountingModel(), {tuple(hashes_a): a})
+    assert hashes_b == hashes_a
+    assert torch.allclose(embed_b, compute_embed(b, CountingModel()))
+
+
+def test_different_clip_matches_two_pass_embedding(tmp_path):
+    a = write_video(tmp_path / "a.mp4", seed=0)
+    b = write_video(tmp_path / "b.mp4", seed=1)
+    model = CountingModel()
+    _, hashes_a = compute_embed_hashes(a, model)
+
+    embed_b, _ = compute_embed_hashes(b, model, {tuple(hashes_a): a})
+    assert torch.allclose(embed_b, compute_embed(b, CountingModel()))
+
+
+def test_late_divergence_falls_back_to_second_pass(tmp_path):
+    a = write_video(tmp_path / "a.mp4", seed=0)
+    b = write_video(tmp_path / "b.mp4", seed=1, prefix_seed=0, prefix_frames=60)
+    _, hashes_a = compute_embed_hashes(a, CountingModel())
+
+    embed_b, hashes_b = compute_embed_hashes(b, CountingModel(), {tuple(hashes_a): a}, max_deferred=2)
+    assert hashes_b[:2] == hashes_a[:2] and hashes_b != hashes_a
+    assert torch.allclose(embed_b, compute_embed(b, CountingModel()))
+
+
+def test_lsh_finds_pairs_at_threshold():
+    generator = torch.Generator().manual_seed(0)
+    base = torch.randn(200, 512, generator=generator)
+    noise = torch.randn(200, 512, generator=generator)
+    base, noise = base / base.norm(dim=-1, keepdim=True), noise / noise.norm(dim=-1, keepdim=True)
+    # Pairs at cosine similarity ~0.95.
+    pairs = 0.95 * base + (1 - 0.95 ** 2) ** 0.5 * noise
+    candidates = lsh_candidates(torch.cat([base, pairs]))
+    found = sum((i, i + 200) in candidates for i in range(200))
+    assert found >= 196
+
+
+def test_cluster_groups_duplicates():
+    embeds = {'a': torch.tensor([1.0, 0.0]), 'b': torch.tensor([0.99, 0.01]), 'c': torch.tensor([0.0, 1.0])}
+    hashes = {'a': [1], 'b': [2], 'c': [3], 'd': [1]}
+    clusters = cluster(embeds, hashes)
+    assert clusters['a'] == clusters['b'] == clusters['d'] != clusters['c']
@@ -0,0 +1,72 @@
+import os
+import shutil
+import subprocess
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from autovideo import preview
+from autovideo.preview import FrameSample, PreviewCache
+
+
+def make_clip(path):
+    path.write_bytes(os.urandom(4096))
+    return str(path)
+
+
+def test_from_frames_is_served_without_ffmpeg(tmp_path, monkeypatch):
+    clip = make_clip(tmp_path / "clip.mp4")
+    cache = PreviewCache(tmp_path / "previews")
+    frames = [np.full((90, 160, 3), i * 20, dtype=np.uint8) for i in range(12)]
+
+    monkeypatch.setattr(cache, "generate", lambda *args: pytest.fail("ffmpeg should not run"))
+    threads = [threading.Thread(target=cache.from_frames, args=(clip, frames)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    poster, key = cache.get(clip, 'poster')
+    sprite, _ = cache.get(clip, 'sprite')
+    assert poster.exists() and sprite.exists() and key == cache.key(clip)
+    assert sorted(os.listdir(cache.cache_dir)) == sorted([poster.name, sprite.name])
+
+
+def test_failed_render_raises_and_leaves_no_temp_files(tmp_path, monkeypatch):
+    clip = make_clip(tmp_path / "clip.mp4")
+    cache = PreviewCache(tmp_path / "previews")
+    monkeypatch.setattr(preview, "probe", lambda path: {'duration': None})
+    # An ffmpeg run that exits cleanly but writes nothing, as when no frame is selected.
+    monkeypatch.setattr(preview.subprocess, "run", lambda *args, **kwargs: None)
+
+    with pytest.raises(RuntimeError):
+        cache.get(clip, 'poster')
+    assert os.listdir(cache.cache_dir) == []
+
+
+def test_frame_sample_is_bounded_and_evenly_spaced():
+    sample = FrameSample(10, width=16)
+    for i in range(600):
+        sample.add(np.full((1080, 1920, 3), i % 256, dtype=np.uint8))
+    assert len(sample.frames) < 20
+    assert all(frame.shape[1] == 16 for frame in sample.frames)
+    assert [int(frame[0, 0, 0]) for frame in sample.frames] == [(i * sample.step) % 256 for i in range(len(sample.frames))]
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_clip_with_single_keyframe_gets_previews(tmp_path, monkeypatch):
+    clip = str(tmp_path / "clip.mp4")
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc=duration=4:size=160x90:rate=10",
+        "-c:v", "mpeg4", "-g", "1000", clip,
+    ], check=True)
+    # The clip's known duration, so the test does not also depend on ffprobe.
+    monkeypatch.setattr(preview, "probe", lambda path: {'duration': 4.0})
+    cache = PreviewCache(tmp_path / "previews")
+
+    poster, _ = cache.get(clip, 'poster')
+    sprite, _ = cache.get(clip, 'sprite')
+    assert os.path.getsize(poster) and os.path.getsize(sprite)
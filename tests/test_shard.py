@@ -0,0 +1,126 @@
+import pickle
+import hashlib
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from autovideo.search import SearchEngine
+from autovideo.text_index import TextIndex
+from autovideo.shard import ShardedSearchEngine, launch_local, partition, resolve_authkey
+
+
+DIM = 16
+
+
+class TextModel:
+    """
+    Stand-in for ModelClip: deterministic pseudo-random unit embeddings per prompt.
+    """
+    def encode_text(self, text: str | list[str]) -> torch.Tensor:
+        texts = [text] if isinstance(text, str) else text
+        embeds = []
+        for t in texts:
+            seed = int.from_bytes(hashlib.md5(t.encode()).digest()[:4], 'little')
+            embeds.append(torch.randn(DIM, generator=torch.Generator().manual_seed(seed)))
+        embeds = torch.stack(embeds)
+        return embeds / embeds.norm(dim=-1, keepdim=True)
+
+
+def write_library(path, n=200, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    embeds = {f"assets/data/clip_{i}.mp4": torch.randn(DIM, generator=generator) for i in range(n)}
+    # A few near-duplicate pairs share a cluster id.
+    clusters = {k: i for i, k in enumerate(embeds)}
+    for i in range(0, min(n, 40), 4):
+        clusters[f"assets/data/clip_{i + 1}.mp4"] = clusters[f"assets/data/clip_{i}.mp4"]
+    with open(path / "embeds.pkl", "wb") as f:
+        pickle.dump(embeds, f)
+    with open(path / "clusters.pkl", "wb") as f:
+        pickle.dump({'clusters': clusters, 'hashes': {}}, f)
+    return embeds
+
+
+def expected(path, query, topk):
+    engine = SearchEngine(path, model=TextModel())
+    return [engine.embed_filenames[i] for i in engine.search(query, topk)]
+
+
+def test_sharded_topk_matches_single_process_search(tmp_path):
+    write_library(tmp_path)
+    queries = [TextModel().encode_text(t) for t in ["mountain", "beach", "city at night"]]
+
+    processes, addresses, authkey = launch_local(tmp_path, n_shards=3, port=0)
+    engine = ShardedSearchEngine(tmp_path, addresses, model=TextModel(), authkey=authkey)
+    try:
+        for query in queries:
+            assert engine.search(query, 10) == expected(tmp_path, query, 10)
+    finally:
+        engine.close()
+        for process in processes:
+            process.join(timeout=10)
+
+    # Rebalance onto 2 shards after clips were added to and removed from embeds.pkl.
+    with open(tmp_path / "embeds.pkl", "rb") as f:
+        embeds = pickle.load(f)
+    del embeds["assets/data/clip_5.mp4"]
+    embeds["assets/data/new.mp4"] = queries[0][0] * 3
+    with open(tmp_path / "embeds.pkl", "wb") as f:
+        pickle.dump(embeds, f)
+
+    processes, addresses, authkey = launch_local(tmp_path, n_shards=2, port=0)
+    engine = ShardedSearchEngine(tmp_path, addresses, model=TextModel(), authkey=authkey)
+    try:
+        assert engine.reload() == len(embeds)
+        for query in queries:
+            assert engine.search(query, 10) == expected(tmp_path, query, 10)
+        assert engine.search(queries[0], 1) == ["assets/data/new.mp4"]
+    finally:
+        engine.close()
+        for process in processes:
+            process.join(timeout=10)
+    assert sorted(p.name for p in (tmp_path / "shards").iterdir()) == ["shard_0.pkl", "shard_1.pkl"]
+
+
+def test_hybrid_search_keeps_clips_missing_from_text_index(tmp_path):
+    embeds = write_library(tmp_path)
+    # Only the first half of the library has text; the rest must still be dense-scanned.
+    words = ["mountain", "beach", "city", "forest"]
+    text_index = TextIndex()
+    for i, k in enumerate(list(embeds)[:100]):
+        text_index.add(k, words[i % len(words)])
+    text_index.save(tmp_path / "text_index.pkl")
+
+    processes, addresses, authkey = launch_local(tmp_path, n_shards=3, port=0)
+    engine = ShardedSearchEngine(tmp_path, addresses, topk=10, model=TextModel(), authkey=authkey)
+    single = SearchEngine(tmp_path, topk=10, model=TextModel())
+    try:
+        for text in ["mountain", "city at night", "volcano"]:
+            assert engine.search_text(text) == single.search_text(text)
+        assert any(k not in text_index for k in engine.search_text("mountain"))
+    finally:
+        engine.close()
+        for process in processes:
+            process.join(timeout=10)
+
+
+def test_partition_drops_deleted_clips(tmp_path):
+    embeds = write_library(tmp_path, n=20)
+    partition(tmp_path, 4)
+    del embeds["assets/data/clip_3.mp4"]
+    with open(tmp_path / "embeds.pkl", "wb") as f:
+        pickle.dump(embeds, f)
+
+    served = set()
+    for shard in partition(tmp_path, 4):
+        with open(shard, "rb") as f:
+            served |= set(pickle.load(f)['embeds'])
+    assert served == set(embeds)
+
+
+def test_authkey_is_required(monkeypatch):
+    monkeypatch.delenv("AUTOVIDEO_SHARD_AUTHKEY", raising=False)
+    with pytest.raises(ValueError):
+        resolve_authkey()
+    monkeypatch.setenv("AUTOVIDEO_SHARD_AUTHKEY", "secret")
+    assert resolve_authkey() == b"secret"
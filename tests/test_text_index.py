@@ -0,0 +1,23 @@
+from autovideo.text_index import TextIndex
+
+
+def test_search_ranks_matching_clips_only():
+    index = TextIndex()
+    index.add('a.mp4', 'a dog on the mountain')
+    index.add('b.mp4', 'cat sleeping')
+    index.add('c.mp4', 'mountain mountain sunset')
+    assert [k for k, _ in index.search('mountain dog')] == ['a.mp4', 'c.mp4']
+    assert index.search('the') == []
+
+
+def test_add_replaces_and_remove_cleans_postings(tmp_path):
+    index = TextIndex()
+    index.add('a.mp4', 'dog beach')
+    index.add('a.mp4', 'snowy mountain')
+    assert index.search('dog') == []
+    assert 'dog' not in index.postings
+
+    index.save(tmp_path / 'text_index.pkl')
+    loaded = TextIndex.load(tmp_path / 'text_index.pkl')
+    loaded.remove('a.mp4')
+    assert len(loaded) == 0 and not loaded.postings and loaded.total_length == 0
@@ -0,0 +1,43 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("openai")
+
+from autovideo import hashing
+from autovideo.transcribe import TranscriptionEngine, encode_wav, split_chunks
+from fake_transcription import SAMPLE_RATE, FakeTranscriptionServer, synthesize
+
+
+def test_split_chunks_terminates_when_chunk_shorter_than_search():
+    samples = synthesize(20)
+    boundaries = split_chunks(samples, SAMPLE_RATE, chunk_seconds=2.0, search_seconds=5.0)
+    assert boundaries[0] == 0 and boundaries[-1] == len(samples)
+    assert all(a < b for a, b in zip(boundaries, boundaries[1:]))
+
+
+def test_chunks_are_stitched_without_gaps_or_duplicates(tmp_path, monkeypatch):
+    n_words = 60
+    audio = tmp_path / "audio.wav"
+    audio.write_bytes(encode_wav(synthesize(n_words), SAMPLE_RATE))
+
+    with FakeTranscriptionServer() as server:
+        engine = TranscriptionEngine(
+            cache_dir=tmp_path / "cache",
+            chunk_seconds=7.0,
+            overlap_seconds=1.3,
+            max_workers=3,
+            base_url=server.base_url,
+            api_key="test",
+        )
+        transcript = engine.transcribe(audio)
+        assert server.requests > 1
+
+        assert [s['text'] for s in transcript['segments']] == [f"w{i}" for i in range(n_words)]
+        starts = [s['start'] for s in transcript['segments']]
+        assert starts == pytest.approx([i * 1.0 for i in range(n_words)], abs=0.01)
+
+        # A second call is served from the cache without contacting the server or re-reading the file.
+        requests = server.requests
+        monkeypatch.setattr(hashing, "open", lambda *args: pytest.fail("cache hit re-read the file"), raising=False)
+        assert engine.transcribe(audio) == transcript
+        assert server.requests == requests
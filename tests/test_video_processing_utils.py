@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+import video_processing_utils
+from video_processing_utils import _clip_index, snap_to_keyframes
+
+
+KEYFRAMES = [0.5, 2.0, 4.0]
+
+
+def test_start_within_tolerance_snaps_to_keyframe():
+    assert snap_to_keyframes([(2.03, 3.0), (3.98, 5.0)], KEYFRAMES, tolerance=0.05) == [(2.0, 3.0), (4.0, 5.0)]
+
+
+def test_start_beyond_tolerance_needs_reencode():
+    assert snap_to_keyframes([(2.0, 3.0), (2.5, 3.5)], KEYFRAMES, tolerance=0.05) is None
+
+
+def test_start_before_first_keyframe_needs_reencode():
+    assert snap_to_keyframes([(0.0, 1.0)], KEYFRAMES, tolerance=0.05) is None
+
+
+def test_clips_sort_by_trailing_number():
+    names = ["trimmed_clip_10.mp4", "trimmed_clip_2.mp4", "IMG_1484_3.mp4", "trimmed_clip_1.mp4"]
+    assert sorted(names, key=_clip_index) == ["trimmed_clip_1.mp4", "trimmed_clip_2.mp4", "IMG_1484_3.mp4", "trimmed_clip_10.mp4"]
+
+
+def test_invalid_pairs_keep_output_numbering(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cuts = {}
+    monkeypatch.setattr(video_processing_utils, "probe_keyframes", lambda path: [0.0, 1.0, 2.0, 3.0])
+    monkeypatch.setattr(video_processing_utils, "_copy_segment", lambda path, start, end, output: cuts.setdefault(os.path.basename(output), (start, end)))
+
+    video_processing_utils.extract_clips("clip.mp4", [(0, 1), (2, 2), (3, 4)])
+    assert cuts == {"trimmed_clip_1.mp4": (0.0, 1.0), "trimmed_clip_3.mp4": (3.0, 4.0)}
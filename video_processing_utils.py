@@ -1,71 +1,161 @@
 # ... existing code ...
 
-import openai
 import os
+import re
+import subprocess
 import dotenv
-from moviepy import VideoFileClip, concatenate_videoclips
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from openai import OpenAI
+
+from autovideo import transcribe
 dotenv.load_dotenv()
 
 def extract_audio(video_path):
     """
-    Extract audio from a video file and save it as MP3.
+    Extract audio from a video file as mono 16 kHz WAV using ffmpeg.
     Returns the path to the extracted audio file.
     """
     try:
-        video = VideoFileClip(video_path)
-        audio_path = video_path.rsplit('.', 1)[0] + '.mp3'
-        video.audio.write_audiofile(audio_path)
-        video.close()
-        return audio_path
+        return str(transcribe.extract_audio(video_path))
     except Exception as e:
         print(f"Error extracting audio: {str(e)}")
         return None
 
-def generate_transcript(audio_path):
+def generate_transcript(audio_path, max_workers=4, base_url=None):
     """
-    Generate transcript from video file using OpenAI's Whisper model.
+    Generate transcript from an audio file using OpenAI's Whisper model.
+    The audio is split into overlapping chunks at silences that are transcribed concurrently,
+    and results are cached by audio content hash.
+    Set `base_url` (or OPENAI_BASE_URL) to use a local Whisper-compatible server.
     Returns the transcript text or None if failed.
     """
     try:
         print("Generating transcript...")
-        # Initialize OpenAI client
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
         # Check if file exists
-        if not os.path.exists(video_path):
+        if not os.path.exists(audio_path):
             raise FileNotFoundError(f"Audio file not found: {audio_path}")
-            
-        # Open the audio file
-        with open(video_path, "rb") as audio_file:
-            # Make the API call with proper error handling
-            try:
-                response = client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file
-                )
-            except Exception as api_error:
-                print(f"API call failed: {str(api_error)}")
-                return None
-                
-        # Check if we got a valid response
-        if response and hasattr(response, 'text'):
-            return response.text
-        else:
-            print("Invalid response format from API")
-            return None
-            
+
+        engine = transcribe.TranscriptionEngine(
+            max_workers=max_workers,
+            base_url=base_url,
+            api_key=os.getenv("OPENAI_API_KEY"),
+        )
+        return engine.transcribe(audio_path)['text']
+
     except Exception as e:
         print(f"Error generating transcript: {str(e)}")
         return None
 
-def extract_clips(video_path, timestamp_pairs):
+def probe_keyframes(video_path):
+    """
+    Return the presentation timestamps (seconds) of all keyframes in the first video stream.
+    Only keyframes are decoded, so this is much cheaper than a full decode pass.
+    """
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-skip_frame", "nokey",
+        "-show_entries", "frame=pts_time",
+        "-of", "csv=p=0",
+        video_path
+    ]
+    output = subprocess.check_output(cmd).decode()
+    return sorted(float(line.split(',')[0]) for line in output.split() if line.strip(',') not in ('', 'N/A'))
+
+def has_audio(video_path):
+    """
+    Return True if the file contains at least one audio stream.
+    """
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "a",
+        "-show_entries", "stream=index",
+        "-of", "csv=p=0",
+        video_path
+    ]
+    return bool(subprocess.check_output(cmd).decode().strip())
+
+def snap_to_keyframes(timestamp_pairs, keyframes, tolerance):
+    """
+    Snap every start time to the last keyframe at or before `start_time + tolerance`.
+    Returns the snapped pairs, or None if any start is further than `tolerance` seconds from a keyframe.
+    """
+    snapped = []
+    for start_time, end_time in timestamp_pairs:
+        previous = [k for k in keyframes if k <= start_time + tolerance]
+        if not previous or start_time - previous[-1] > tolerance:
+            return None
+        snapped.append((max(previous[-1], 0.0), end_time))
+    return snapped
+
+def _copy_segment(video_path, start_time, end_time, output_path):
+    """
+    Cut a single segment with stream copy (no decode, no encode).
+    Input seeking lands on the keyframe at or before `start_time`.
+    """
+    cmd = [
+        "ffmpeg", "-y", "-v", "error",
+        "-ss", str(start_time),
+        "-i", video_path,
+        "-t", str(end_time - start_time),
+        # Only the main video and audio tracks; phone metadata/timecode tracks (mebx, tmcd) are rejected by the mp4 muxer.
+        "-map", "0:v:0",
+        "-map", "0:a?",
+        "-dn",
+        "-c", "copy",
+        "-avoid_negative_ts", "make_zero",
+        output_path
+    ]
+    subprocess.run(cmd, check=True)
+    return output_path
+
+def _encode_segments(video_path, timestamp_pairs, output_paths):
     """
-    Extract video clips based on start and end timestamps.
+    Cut all segments with frame accuracy in a single decode pass.
+    The decoded stream is split once per segment, trimmed, and written to one output per segment,
+    so ffmpeg encodes the outputs concurrently instead of re-opening the file for every clip.
+    """
+    # Seek straight to the first requested frame and stop after the last one.
+    offset = min(start for start, _ in timestamp_pairs)
+    duration = max(end for _, end in timestamp_pairs) - offset
+    audio = has_audio(video_path)
+
+    n = len(timestamp_pairs)
+    filter_parts = ["[0:v]split=" + str(n) + "".join(f"[vs{i}]" for i in range(n))]
+    if audio:
+        filter_parts.append("[0:a]asplit=" + str(n) + "".join(f"[as{i}]" for i in range(n)))
+    for i, (start_time, end_time) in enumerate(timestamp_pairs):
+        start, end = start_time - offset, end_time - offset
+        filter_parts.append(f"[vs{i}]trim=start={start}:end={end},setpts=PTS-STARTPTS[v{i}]")
+        if audio:
+            filter_parts.append(f"[as{i}]atrim=start={start}:end={end},asetpts=PTS-STARTPTS[a{i}]")
+
+    cmd = [
+        "ffmpeg", "-y", "-v", "error",
+        "-ss", str(offset),
+        "-t", str(duration),
+        "-i", video_path,
+        "-filter_complex", ";".join(filter_parts),
+    ]
+    for i, output_path in enumerate(output_paths):
+        cmd.extend(["-map", f"[v{i}]"])
+        if audio:
+            cmd.extend(["-map", f"[a{i}]", "-c:a", "aac"])
+        cmd.extend(["-c:v", "libx264", "-preset", "veryfast", "-crf", "18", output_path])
+    subprocess.run(cmd, check=True)
+    return output_paths
+
+def extract_clips(video_path, timestamp_pairs, exact=True, tolerance=0.05, max_workers=None):
+    """
+    Extract video clips based on start and end timestamps using ffmpeg.
     Args:
         video_path: Path to the video file
         timestamp_pairs: List of tuples containing (start_time, end_time) in seconds
+        exact: If False, always cut with keyframe-aligned stream copy (fast, may start early).
+               If True, stream copy is only used when every start lies within `tolerance`
+               seconds of a keyframe; otherwise all clips are re-encoded in one decode pass.
+        tolerance: Maximum distance in seconds between a start time and a keyframe for stream copy
+        max_workers: Number of parallel stream copy cuts (defaults to one per clip, at most one per CPU)
     Returns:
         str: Path to output directory containing the clips
     """
@@ -76,45 +166,55 @@ def extract_clips(video_path, timestamp_pairs):
         current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_dir = f"output_{current_time}"
         os.makedirs(output_dir, exist_ok=True)
-        
 
-        
-        # Extract each clip
+        # Invalid pairs are skipped but keep their number, so trimmed_clip_N always matches input pair N.
+        indices = []
         for idx, (start_time, end_time) in enumerate(timestamp_pairs, 1):
-            try:
-                # Load video
-                video = VideoFileClip(video_path)
-                # Extract the subclip using subclip method - using start and end instead of t_start and t_end
-                clip = video.subclipped(start_time, end_time)
-                
-                # Generate output path
-                output_path = os.path.join(output_dir, f"trimmed_clip_{idx}.mp4")
-                
-                # Write the clip without the progress_bar parameter
-                clip.write_videofile(output_path, 
-                                   codec='libx264', 
-                                   audio_codec='aac',
-                                   temp_audiofile=f'{output_dir}/temp-audio.m4a',
-                                   remove_temp=True)
-                
-                # Close the subclip to free memory
-                clip.close()
-                
-            except Exception as e:
-                print(f"Error processing clip {idx}: {str(e)}")
+            if float(end_time) <= float(start_time):
+                print(f"Skipping clip {idx}: end time {end_time} is not after start time {start_time}")
                 continue
-        
-        # Close the main video
-        video.close()
-        
+            indices.append(idx)
+        timestamp_pairs = [(float(timestamp_pairs[idx - 1][0]), float(timestamp_pairs[idx - 1][1])) for idx in indices]
+        if not timestamp_pairs:
+            print("No valid timestamp pairs to extract.")
+            return output_dir
+        output_paths = [os.path.join(output_dir, f"trimmed_clip_{idx}.mp4") for idx in indices]
+
+        snapped = timestamp_pairs
+        if exact:
+            snapped = snap_to_keyframes(timestamp_pairs, probe_keyframes(video_path), tolerance)
+
+        if snapped is None:
+            _encode_segments(video_path, timestamp_pairs, output_paths)
+        else:
+            # Stream copy is I/O bound, so cut every segment concurrently.
+            with ThreadPoolExecutor(max_workers=max_workers or min(len(snapped), os.cpu_count() or 1)) as executor:
+                futures = {
+                    executor.submit(_copy_segment, video_path, start_time, end_time, output_path): idx
+                    for idx, (start_time, end_time), output_path in zip(indices, snapped, output_paths)
+                }
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"Error processing clip {futures[future]}: {str(e)}")
+
         return output_dir
     except Exception as e:
         print(f"Error extracting clips: {str(e)}")
         return None
 
+def _clip_index(filename):
+    """
+    Sort key that orders trimmed_clip_2.mp4 before trimmed_clip_10.mp4, by the number at the end of the name.
+    """
+    match = re.search(r"(\d+)$", os.path.splitext(filename)[0])
+    return (int(match.group(1)) if match else -1, filename)
+
 def merge_clips(directory, output_filename):
     """
     Merge all MP4 clips in the specified directory into a single video file.
+    Clips are joined with the ffmpeg concat demuxer and stream copy, so nothing is re-encoded.
     Args:
         directory: Path to the directory containing the clips
         output_filename: Desired name for the merged video file
@@ -123,29 +223,36 @@ def merge_clips(directory, output_filename):
     """
     try:
         # Find all MP4 files in the directory
-        clips = [f for f in os.listdir(directory) if f.endswith(('.mp4', '.MP4'))]
-        
+        clips = [f for f in os.listdir(directory) if f.endswith(('.mp4', '.MP4')) and f != output_filename]
+
         if not clips:
             print("No clips found in the specified directory.")
             return None
-        
+
         # Sort clips to maintain order
-        clips.sort()
-        
-        # Load and concatenate clips
-        clips_list = [VideoFileClip(os.path.join(directory, clip)) for clip in clips]
-        final_clip = concatenate_videoclips(clips_list)
-        
+        clips.sort(key=_clip_index)
+
+        # Write the concat demuxer playlist
+        list_path = os.path.join(directory, "clips.txt")
+        with open(list_path, "w") as f:
+            for clip in clips:
+                f.write(f"file '{clip}'\n")
+
         # Save the merged video
         output_path = os.path.join(directory, output_filename)
-        final_clip.write_videofile(output_path, codec='libx264', audio_codec='aac')
-        
-        # Clean up resources
-        for clip in clips_list:
-            clip.close()
-        final_clip.close()
-        
+        cmd = [
+            "ffmpeg", "-y", "-v", "error",
+            "-f", "concat", "-safe", "0",
+            "-i", list_path,
+            "-c", "copy",
+            output_path
+        ]
+        try:
+            subprocess.run(cmd, check=True)
+        finally:
+            os.remove(list_path)
+
         return output_path
     except Exception as e:
         print(f"Error merging clips: {str(e)}")
-        return None
\ No newline at end of file
+        return None